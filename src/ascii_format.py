@@ -0,0 +1,6 @@
+# The metadata header ends with an 80-character separator followed by a blank line.
+HEADER_SEPARATOR = b"\n" + b"=" * 80 + b"\n\n"
+
+def frame_separator(width):
+    """Return the separator that terminates each frame of the given width."""
+    return b"\n" + b"=" * width + b"\n"
@@ -1,77 +1,102 @@
+import os
+import re
 import time
+import mmap
 import curses
+import numpy as np
+from ascii_format import HEADER_SEPARATOR, frame_separator
 
 def read_ascii_frames(file_path):
-    """Read ASCII art frames from a text file and extract metadata."""
-    frames = []
+    """Map an ASCII art file and locate its frames, returning the raw bytes, frame bounds and metadata.
+
+    The returned bytes are a memory mapping that the caller should close, e.g. with `with blob:`.
+    """
     metadata = {}
+    blob = None
 
     try:
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
-
-        # Initialize metadata parsing state.
-        parsing_metadata = True
-        frame_lines = []
-
-        for line in lines:
-            line = line.rstrip()  # Strip only trailing whitespace.
-            if not line:
-                # Stop parsing metadata when encountering an empty line.
-                parsing_metadata = False
-                continue
-
-            if parsing_metadata:
-                if line.startswith("Video Resolution:"):
-                    metadata['resolution'] = line.split(":", 1)[1].strip()
-                elif line.startswith("Video FPS:"):
-                    try:
-                        metadata['fps'] = int(line.split(":", 1)[1].strip())
-                    except ValueError:
-                        raise ValueError(f"Invalid FPS value in metadata: {line.split(':', 1)[1].strip()}")
-            else:
-                # Collect frames after metadata has been parsed.
-                if line.startswith("=" * 80):
-                    if frame_lines:  # Avoid adding empty frames.
-                        frames.append('\n'.join(frame_lines))
-                        frame_lines = []  # Reset for next frame.
-                else:
-                    frame_lines.append(line)
-
-        # Append the last frame if any.
-        if frame_lines:
-            frames.append('\n'.join(frame_lines))
+        with open(file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                # An empty file cannot be mapped; an empty memoryview still supports `with blob:`.
+                return memoryview(b""), np.empty((0, 2), dtype=np.int64), metadata
+            blob = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header_end = blob.find(HEADER_SEPARATOR)
+        if header_end == -1:
+            header_end = len(blob)
+
+        for line in blob[:header_end].decode('ascii').splitlines():
+            if line.startswith("Video Resolution:"):
+                metadata['resolution'] = line.split(":", 1)[1].strip()
+            elif line.startswith("Video FPS:"):
+                try:
+                    metadata['fps'] = float(line.split(":", 1)[1].strip())
+                except ValueError:
+                    raise ValueError(f"Invalid FPS value in metadata: {line.split(':', 1)[1].strip()}")
+
+        # Frames stay in the mapped file; each row of `frame_bounds` is a frame's (start, end) offset.
+        frame_bounds = np.empty((0, 2), dtype=np.int64)
+        body_start = header_end + len(HEADER_SEPARATOR)
+        if body_start < len(blob):
+            # Each frame is terminated by a separator as wide as its rows.
+            frame_width = blob.find(b"\n", body_start) - body_start
+            separator = frame_separator(frame_width)
+
+            frame_ends = np.fromiter(
+                (match.start() for match in re.compile(re.escape(separator)).finditer(blob, body_start)),
+                dtype=np.int64
+            )
+            frame_starts = np.concatenate(([body_start], frame_ends + len(separator)))[:len(frame_ends)]
+            frame_bounds = np.column_stack((frame_starts, frame_ends))
 
     except FileNotFoundError:
         raise FileNotFoundError(f"File {file_path} not found!")
     except Exception as e:
+        if blob is not None:
+            blob.close()
         raise RuntimeError(f"An error occurred while reading frames: {e}")
 
-    return frames, metadata
+    return blob, frame_bounds, metadata
+
+def fit_to_terminal(frame, terminal_height, terminal_width):
+    """Clip a frame to the terminal, one column short of the edge so curses never wraps a row."""
+    if frame.count("\n") < terminal_height and len(frame.partition("\n")[0]) < terminal_width:
+        return frame
+
+    return "\n".join(line[:terminal_width - 1] for line in frame.split("\n")[:terminal_height])
 
-def display_ascii_animation(stdscr, frames, fps=24):
+def display_ascii_animation(stdscr, blob, frame_bounds, fps=24):
     """Display ASCII art frames in the terminal using curses."""
     curses.curs_set(0)  # Hide cursor.
     stdscr.nodelay(1)   # Make getch() non-blocking.
     
     terminal_height, terminal_width = stdscr.getmaxyx()
     frame_duration = 1 / fps
+
     start_time = time.time()
 
     frame_index = 0
-    while frame_index < len(frames):
+    previous_frame = None
+    while frame_index < len(frame_bounds):
         frame_start_time = time.time()
 
-        # Clear the screen.
-        stdscr.clear()
-        
-        # Resize and display frame within the terminal size.
-        frame_lines = frames[frame_index].split('\n')
-        for y, line in enumerate(frame_lines[:terminal_height]):
-            if y < terminal_height:
-                stdscr.addstr(y, 0, line[:terminal_width])
-        
-        stdscr.refresh()
+        start, end = frame_bounds[frame_index]
+        current_frame = blob[start:end]
+
+        # Only redraw when the frame differs from the one already on screen.
+        if current_frame != previous_frame:
+            previous_frame = current_frame
+
+            # Blank the screen; unlike clear(), erase() lets curses redraw only what changed.
+            stdscr.erase()
+
+            # Decode the frame only when it is shown and draw it in a single call.
+            frame = previous_frame.decode('ascii')
+            stdscr.addstr(0, 0, fit_to_terminal(frame, terminal_height, terminal_width))
+
+            # Stage the window and flush only the changed cells to the terminal.
+            stdscr.noutrefresh()
+            curses.doupdate()
 
         render_time = time.time() - frame_start_time
         elapsed_time = time.time() - start_time
@@ -93,15 +118,17 @@ if __name__ == "__main__":
     ascii_file_path = 'video_ascii.txt'
 
     try:
-        frames, metadata = read_ascii_frames(ascii_file_path)
+        blob, frame_bounds, metadata = read_ascii_frames(ascii_file_path)
         fps = metadata.get('fps', 24)  # Default to 24 FPS if not found.
         
-        curses.wrapper(display_ascii_animation, frames, fps)
+        # The frames are read from the mapping, so keep it open until playback ends.
+        with blob:
+            curses.wrapper(display_ascii_animation, blob, frame_bounds, fps)
     
     except FileNotFoundError as fnf_error:
         print(fnf_error)
-    except RuntimeError as re:
-        print(re)
+    except RuntimeError as error:
+        print(error)
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
 
@@ -1,10 +1,10 @@
 import cv2
+import numpy as np
 import subprocess
 import os
 import logging
-from concurrent.futures import ProcessPoolExecutor, as_completed
-from queue import Queue, Empty
-from threading import Thread
+from collections import OrderedDict
+from ascii_format import HEADER_SEPARATOR, frame_separator
 
 # Configure logging
 logging.basicConfig(
@@ -18,6 +18,18 @@ logging.basicConfig(
 
 ASCII_CHARS = "@%#*+=-:. "
 
+# Translation table mapping every grayscale byte to its ASCII character byte.
+ASCII_TABLE = bytes(
+    ord(ASCII_CHARS[min(len(ASCII_CHARS) - 1, value // (256 // len(ASCII_CHARS)))])
+    for value in range(256)
+)
+
+# Output buffers reused by `frame_to_ascii` across frames, keyed by grid size.
+_frame_buffers = {}
+
+# Number of distinct downsampled frames whose ASCII conversion is remembered.
+FRAME_CACHE_SIZE = 256
+
 def download_youtube_video(url, output_path, resolution="360p"):
     """Download a YouTube video at the specified resolution."""
     logging.info(f"Starting download for {url} with resolution {resolution}.")
@@ -48,63 +60,68 @@ def download_youtube_video(url, output_path, resolution="360p"):
         logging.error("Merged video file not found after download!")
         raise FileNotFoundError("Merged video file not found after download!")
 
-def frame_to_ascii(frame, width=100):
-    """Convert a video frame to ASCII art."""
-    if frame is None:
-        return ""
-    
-    height, original_width = frame.shape[:2]
-    aspect_ratio = original_width / height
-    new_height = int(width / aspect_ratio)
-
-    resized_frame = cv2.resize(frame, (width, new_height))
-    gray_frame = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2GRAY)
-
-    ascii_art = ''.join(
-        ASCII_CHARS[min(len(ASCII_CHARS) - 1, pixel_value // (256 // len(ASCII_CHARS)))]
-        for pixel_value in gray_frame.flatten()
-    )
-
-    return ascii_art
+def read_gray_frames(video_path, width, height):
+    """Yield the frames of a video as raw grayscale bytes, shrunk to the ASCII grid size."""
+    # ffmpeg resizes and converts with its own SIMD code and emits exactly one byte per cell.
+    # `out_range=full` asks for 0-255 gray like `cv2.COLOR_BGR2GRAY`, which `ASCII_TABLE` assumes,
+    # rather than relying on the scaler's default range for gray output.
+    cmd = [
+        'ffmpeg', '-loglevel', 'error',
+        '-i', video_path,
+        '-vf', f'scale={width}:{height}:flags=area:out_range=full',
+        '-pix_fmt', 'gray',
+        '-fps_mode', 'passthrough',
+        '-f', 'rawvideo', '-'
+    ]
 
-def process_frame(frame_idx, width, frame, total_frames):
-    """Process a single video frame and convert it to ASCII."""
+    frame_size = width * height
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, bufsize=1 << 20) as process:
+        while True:
+            buffer = process.stdout.read(frame_size)
+            if len(buffer) < frame_size:
+                break
+            yield buffer
+
+    if process.returncode != 0:
+        logging.error(f"ffmpeg exited with status {process.returncode} while decoding {video_path}!")
+        raise RuntimeError("Error decoding video!")
+
+def frame_to_ascii(gray_frame, width, height):
+    """Convert a grayscale frame to ASCII art bytes, one line per row followed by the frame separator."""
+    # Rows are laid out with a trailing newline column and an extra separator row below them,
+    # so the whole frame comes out of a single buffer. The buffer is allocated once per grid
+    # size, with the newlines and separator already in place.
+    ascii_frame = _frame_buffers.get((height, width))
+    if ascii_frame is None:
+        ascii_frame = np.empty((height + 1, width + 1), dtype=np.uint8)
+        ascii_frame[:, width] = ord('\n')
+        # The buffer ends with the frame separator, whose leading newline is the last row's.
+        separator = frame_separator(width)
+        ascii_frame.reshape(-1)[-len(separator):] = np.frombuffer(separator, dtype=np.uint8)
+        _frame_buffers[(height, width)] = ascii_frame
+
+    # `bytes.translate` maps every pixel in one C loop; the result is then laid out row by row.
+    # Despite the extra temporary, this measured faster than an `np.take(..., out=...)` gather.
+    ascii_pixels = gray_frame.translate(ASCII_TABLE)
+    ascii_frame[:height, :width] = np.frombuffer(ascii_pixels, dtype=np.uint8).reshape(height, width)
+
+    return ascii_frame.tobytes()
+
+def process_frame(frame_idx, gray_frame, width, height):
+    """Process a single downsampled video frame and convert it to ASCII."""
     try:
-        ascii_art = frame_to_ascii(frame, width)
-        ascii_art_lines = [ascii_art[i:i + width] for i in range(0, len(ascii_art), width)]
-        
-        percentage_complete = (frame_idx + 1) / total_frames * 100
-        logging.info(f"Processed frame {frame_idx}/{total_frames}. (Progress: {percentage_complete:.2f}%)")
-
-        return frame_idx, "\n".join(ascii_art_lines) + "\n" + "=" * width + "\n"
+        return frame_to_ascii(gray_frame, width, height)
     except Exception as e:
         logging.error(f"Error processing frame {frame_idx}: {e}")
-        return frame_idx, ""
+        return b""
 
-def write_ascii_to_file(file_path, queue, total_frames, video_metadata):
-    """Write ASCII art frames to a text file, preserving order."""
-    with open(file_path, 'w') as f:
-        # Write metadata at the beginning.
-        f.write(f"Video Resolution: {video_metadata['resolution']}\n")
-        f.write(f"Video FPS: {video_metadata['fps']}\n")
-        f.write("\n" + "=" * 80 + "\n\n")
+def write_ascii_header(f, video_metadata):
+    """Write the video metadata header that precedes the ASCII art frames."""
+    f.write(f"Video Resolution: {video_metadata['resolution']}\n".encode('ascii'))
+    f.write(f"Video FPS: {video_metadata['fps']:.6f}\n".encode('ascii'))
+    f.write(HEADER_SEPARATOR)
 
-        frames = {}
-        frames_written = 0
-        while frames_written < total_frames:
-            try:
-                frame_idx, ascii_art = queue.get(timeout=1)
-                if frame_idx is None:  # End of queue signal.
-                    continue
-                frames[frame_idx] = ascii_art
-                while frames_written in frames:
-                    f.write(frames.pop(frames_written))
-                    frames_written += 1
-                logging.debug(f"Written {frames_written} frames to file.")
-            except Empty:
-                continue
-
-def video_to_ascii(video_path, output_file, width=100, frame_step=10, num_processes=4):
+def video_to_ascii(video_path, output_file, width=100, frame_step=10):
     """Convert a video to ASCII art and save it to a text file."""
     logging.info(f"Converting video {video_path} to ASCII art...")
 
@@ -114,16 +131,17 @@ def video_to_ascii(video_path, output_file, width=100, frame_step=10, num_proces
         raise ValueError("Could not open video file!")
 
     frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    fps = cap.get(cv2.CAP_PROP_FPS)  # Kept fractional, e.g. 29.97, so playback does not drift.
     video_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     video_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-   
+    cap.release()  # Only needed for the metadata; ffmpeg does the decoding.
+
     video_metadata = {
         'resolution': f"{video_width}x{video_height}",
         'fps': fps
     }
     
-    logging.info(f"Video FPS: {fps}, Width: {video_width}, Height: {video_height}")
+    logging.info(f"Video FPS: {fps:.2f}, Width: {video_width}, Height: {video_height}")
     logging.info(f"Total frames in video: {frame_count}")
     
     if frame_step == 1:
@@ -140,34 +158,46 @@ def video_to_ascii(video_path, output_file, width=100, frame_step=10, num_proces
 
         logging.info(f"Processing every {ordinal(frame_step)} frame...")
 
-    frame_indices = list(range(0, frame_count, frame_step))
-    total_frames = len(frame_indices)
+    total_frames = len(range(0, frame_count, frame_step))
 
-    queue = Queue(maxsize=num_processes * 2)
+    # Frames are shrunk to the ASCII grid by the decoder before they reach Python.
+    aspect_ratio = video_width / video_height
+    ascii_height = int(width / aspect_ratio)
+
+    # Converting a frame takes microseconds and holds the GIL, so it is done inline while decoding;
+    # a worker pool would only add scheduling overhead. Frames are ASCII bytes already, so they are
+    # written unencoded through a 1 MiB buffer.
+    with open(output_file, 'wb', buffering=1 << 20) as f:
+        write_ascii_header(f, video_metadata)
+
+        # Identical downsampled frames share one conversion, most recently used last.
+        frame_cache = OrderedDict()
+        frames_written = 0
+        progress_interval = max(1, total_frames // 100)
 
-    with ProcessPoolExecutor(max_workers=num_processes) as executor:
-        futures = []
         logging.info("Starting frame processing...")
-        for i in frame_indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-            ret, frame = cap.read()
-            if not ret:
-                logging.warning(f"Frame {i} could not be read!")
+        # Decode in one sequential pass; seeking forces the decoder back to the nearest keyframe.
+        for i, gray_frame in enumerate(read_gray_frames(video_path, width, ascii_height)):
+            if i % frame_step:
                 continue
 
-            futures.append(executor.submit(process_frame, i, width, frame, total_frames))
+            ascii_art = frame_cache.get(gray_frame)
+            if ascii_art is None:
+                ascii_art = process_frame(i, gray_frame, width, ascii_height)
+                frame_cache[gray_frame] = ascii_art
+                if len(frame_cache) > FRAME_CACHE_SIZE:
+                    frame_cache.popitem(last=False)
+            else:
+                frame_cache.move_to_end(gray_frame)
 
-        writer_thread = Thread(target=write_ascii_to_file, args=(output_file, queue, total_frames, video_metadata))
-        writer_thread.start()
+            f.write(ascii_art)
+            frames_written += 1
 
-        for future in as_completed(futures):
-            frame_idx, ascii_art = future.result()
-            queue.put((frame_idx, ascii_art))
-        
-        queue.put((None, None))  # Signal the end of processing.
-        writer_thread.join()
+            # Report progress about once per percent instead of for every frame.
+            if frames_written % progress_interval == 0:
+                percentage_complete = frames_written / total_frames * 100
+                logging.info(f"Processed frame {frames_written}/{total_frames}. (Progress: {percentage_complete:.2f}%)")
 
-    cap.release()
     logging.info(f'Video conversion to ASCII art completed, output written to "{output_file}".')
 
 if __name__ == '__main__':
@@ -178,7 +208,7 @@ if __name__ == '__main__':
         logging.info("Starting video download...")
         download_youtube_video(url, output_path)
         logging.info("Video download complete. Starting video to ASCII conversion...")
-        video_to_ascii(output_path + '.mp4', 'video_ascii.txt', width=160, frame_step=1, num_processes=32)
+        video_to_ascii(output_path + '.mp4', 'video_ascii.txt', width=160, frame_step=1)
         logging.info('ASCII art video written to "video_ascii.txt".')
         os.remove(output_path + '.mp4')  # Clean up by removing the downloaded video.
         logging.info("Downloaded video file removed.")